@@ -18,6 +18,10 @@ async function connectToMongo() {
       client = new MongoClient(process.env.MONGO_URL)
       await client.connect()
       db = client.db(DB_NAME)
+      await db.collection('portal_snapshots').createIndex({ client_id: 1 }, { unique: true })
+      await db.collection('portal_snapshots').createIndex({ slug: 1, is_active: 1 })
+      await db.collection('tasks').createIndex({ client_id: 1 })
+      await db.collection('reports').createIndex({ client_id: 1 })
     } catch (e) {
       client = null
       db = null
@@ -49,6 +53,133 @@ function verifyToken(request) {
   }
 }
 
+// ===== PORTAL SNAPSHOTS =====
+// One document per client holding exactly what GET /portal/{slug} returns, so the
+// portal is a single indexed read. Single writes patch it in place; batch writes
+// rebuild it. Every change bumps `version` and only applies if the version is the
+// one read before the source write, so overlapping writes fall back to a rebuild
+// instead of leaving a stale copy. Array elements keep their `_id` (insertion
+// order) as the sort tie-breaker; the portal read projects it away.
+const PORTAL_SORTS = {
+  tasks: { category: 1, created_at: 1, _id: 1 },
+  reports: { report_date: -1, _id: 1 }
+}
+const PORTAL_SNAPSHOT_PROJECTION = { 'tasks._id': 0, 'reports._id': 0 }
+const PORTAL_SNAPSHOT_RETRIES = 5
+
+function snapshotClientFields(clientDoc) {
+  const { _id, portal_password, ...clientData } = clientDoc
+  return {
+    slug: clientDoc.slug,
+    is_active: clientDoc.is_active,
+    portal_password: portal_password || null,
+    client: clientData
+  }
+}
+
+async function computePortalSnapshot(database, clientDoc) {
+  const tasks = await database.collection('tasks').find({ client_id: clientDoc.id }).sort(PORTAL_SORTS.tasks).toArray()
+  const reports = await database.collection('reports').find({ client_id: clientDoc.id }).sort(PORTAL_SORTS.reports).toArray()
+  return { client_id: clientDoc.id, ...snapshotClientFields(clientDoc), tasks, reports, updated_at: new Date() }
+}
+
+// Recompute a client's snapshot and swap it in only if no other change landed
+// since we read its version; otherwise retry against the newer data.
+async function rebuildPortalSnapshot(database, clientId) {
+  const snapshots = database.collection('portal_snapshots')
+  let snapshot = null
+  for (let attempt = 0; attempt < PORTAL_SNAPSHOT_RETRIES; attempt++) {
+    const current = await snapshots.findOne({ client_id: clientId }, { projection: { version: 1 } })
+    const clientDoc = await database.collection('clients').findOne({ id: clientId })
+    if (!clientDoc) {
+      await snapshots.deleteOne({ client_id: clientId })
+      return null
+    }
+    snapshot = { ...await computePortalSnapshot(database, clientDoc), version: (current?.version || 0) + 1 }
+    if (current) {
+      const result = await snapshots.replaceOne({ client_id: clientId, version: current.version ?? null }, snapshot)
+      if (result.matchedCount > 0) return snapshot
+    } else {
+      try {
+        await snapshots.insertOne({ ...snapshot })
+      } catch (e) {
+        if (e.code !== 11000) throw e
+        continue
+      }
+      // A client deleted while we were building must not leave its portal behind
+      if (await database.collection('clients').countDocuments({ id: clientId }, { limit: 1 })) return snapshot
+      await snapshots.deleteOne({ client_id: clientId })
+      return null
+    }
+  }
+  // Kept losing races: drop the snapshot so the next portal view rebuilds it
+  await snapshots.deleteOne({ client_id: clientId })
+  return snapshot
+}
+
+// Snapshot upkeep never fails a write that already committed: on error the
+// snapshot is dropped and the next portal view rebuilds it.
+async function dropPortalSnapshot(database, clientId, error) {
+  console.error('Portal snapshot sync failed:', error)
+  await database.collection('portal_snapshots').deleteOne({ client_id: clientId }).catch(() => {})
+}
+
+async function rebuildPortalSnapshots(database, clientIds) {
+  await Promise.all([...new Set(clientIds)].filter(Boolean).map(cid =>
+    rebuildPortalSnapshot(database, cid).catch(e => dropPortalSnapshot(database, cid, e))
+  ))
+}
+
+// Read before the source write; null means the client has no snapshot yet.
+async function portalSnapshotVersions(database, clientIds) {
+  const ids = [...new Set(clientIds)].filter(Boolean)
+  const docs = await database.collection('portal_snapshots')
+    .find({ client_id: { $in: ids } }, { projection: { client_id: 1, version: 1 } }).toArray()
+  const versions = Object.fromEntries(ids.map(cid => [cid, null]))
+  for (const d of docs) versions[d.client_id] = d.version ?? null
+  return versions
+}
+
+// Apply `steps` ({ filter, update }) in order, each guarded by and bumping the version.
+async function patchPortalSnapshot(database, clientId, version, steps) {
+  try {
+    let current = version
+    for (const { filter = {}, update } of steps) {
+      if (current == null) break
+      const result = await database.collection('portal_snapshots').updateOne(
+        { ...filter, client_id: clientId, version: current },
+        { ...update, $set: { ...update.$set, updated_at: new Date() }, $inc: { version: 1 } }
+      )
+      current = result.matchedCount > 0 ? current + 1 : null
+    }
+    if (current == null) await rebuildPortalSnapshot(database, clientId)
+  } catch (e) {
+    await dropPortalSnapshot(database, clientId, e)
+  }
+}
+
+// Mirror a single task/report write (`before`/`after` are full source documents,
+// either may be null) into the snapshots of the clients it touched.
+async function syncSnapshotItem(database, field, versions, before, after) {
+  const sort = PORTAL_SORTS[field]
+  if (before && after && before.client_id === after.client_id) {
+    const steps = [{ filter: { [`${field}._id`]: after._id }, update: { $set: { [`${field}.$`]: after } } }]
+    if (Object.keys(sort).some(k => JSON.stringify(before[k]) !== JSON.stringify(after[k]))) {
+      steps.push({ update: { $push: { [field]: { $each: [], $sort: sort } } } })
+    }
+    await patchPortalSnapshot(database, after.client_id, versions[after.client_id], steps)
+    return
+  }
+  if (before) {
+    await patchPortalSnapshot(database, before.client_id, versions[before.client_id],
+      [{ update: { $pull: { [field]: { _id: before._id } } } }])
+  }
+  if (after) {
+    await patchPortalSnapshot(database, after.client_id, versions[after.client_id],
+      [{ update: { $push: { [field]: { $each: [after], $sort: sort } } } }])
+  }
+}
+
 async function handleRoute(request, { params }) {
   const { path = [] } = params
   const route = `/${path.join('/')}`
@@ -136,6 +267,7 @@ async function handleRoute(request, { params }) {
           { id: uuidv4(), client_id: clientIds[1], title: 'Q1 Audit Report', report_type: 'Audit Report', report_url: 'https://docs.google.com', report_date: '2025-03-31', notes: 'Full technical audit', created_at: now },
           { id: uuidv4(), client_id: clientIds[2], title: 'May 2025 Ad Performance', report_type: 'Ad Performance', report_url: 'https://lookerstudio.google.com', report_date: '2025-05-31', notes: 'ROAS: 3.8x', created_at: now },
         ])
+        await rebuildPortalSnapshots(database, clientIds)
       }
       return handleCORS(NextResponse.json({ message: 'Seed data created successfully' }))
     }
@@ -171,6 +303,7 @@ async function handleRoute(request, { params }) {
         created_at: new Date()
       }
       await database.collection('clients').insertOne(client)
+      await rebuildPortalSnapshots(database, [client.id])
       return handleCORS(NextResponse.json(client))
     }
 
@@ -189,8 +322,10 @@ async function handleRoute(request, { params }) {
         const body = await request.json()
         const { _id, id, ...updateData } = body
         updateData.updated_at = new Date()
+        const versions = await portalSnapshotVersions(database, [clientId])
         await database.collection('clients').updateOne({ id: clientId }, { $set: updateData })
         const updated = await database.collection('clients').findOne({ id: clientId })
+        if (updated) await patchPortalSnapshot(database, clientId, versions[clientId], [{ update: { $set: snapshotClientFields(updated) } }])
         const { _id: _, ...result } = updated
         return handleCORS(NextResponse.json(result))
       }
@@ -200,6 +335,7 @@ async function handleRoute(request, { params }) {
         await database.collection('clients').deleteOne({ id: clientId })
         await database.collection('tasks').deleteMany({ client_id: clientId })
         await database.collection('reports').deleteMany({ client_id: clientId })
+        await database.collection('portal_snapshots').deleteOne({ client_id: clientId })
         return handleCORS(NextResponse.json({ message: 'Client deleted' }))
       }
     }
@@ -261,7 +397,9 @@ async function handleRoute(request, { params }) {
         created_at: new Date(),
         updated_at: new Date()
       }
+      const versions = await portalSnapshotVersions(database, [client_id])
       await database.collection('tasks').insertOne(task)
+      await syncSnapshotItem(database, 'tasks', versions, null, task)
       return handleCORS(NextResponse.json(task))
     }
 
@@ -311,6 +449,7 @@ async function handleRoute(request, { params }) {
 
       if (toInsert.length > 0) {
         await database.collection('tasks').insertMany(toInsert)
+        await rebuildPortalSnapshots(database, toInsert.map(t => t.client_id))
       }
 
       return handleCORS(NextResponse.json({
@@ -329,15 +468,21 @@ async function handleRoute(request, { params }) {
         const body = await request.json()
         const { _id, id, ...updateData } = body
         updateData.updated_at = new Date()
+        const before = await database.collection('tasks').findOne({ id: taskId })
+        const versions = await portalSnapshotVersions(database, [before?.client_id, updateData.client_id])
         await database.collection('tasks').updateOne({ id: taskId }, { $set: updateData })
         const updated = await database.collection('tasks').findOne({ id: taskId })
+        await syncSnapshotItem(database, 'tasks', versions, before, updated)
         const { _id: _, ...result } = updated
         return handleCORS(NextResponse.json(result))
       }
       if (method === 'DELETE') {
         const user = verifyToken(request)
         if (!user) return handleCORS(NextResponse.json({ error: 'Unauthorized' }, { status: 401 }))
+        const task = await database.collection('tasks').findOne({ id: taskId })
+        const versions = await portalSnapshotVersions(database, [task?.client_id])
         await database.collection('tasks').deleteOne({ id: taskId })
+        if (task) await syncSnapshotItem(database, 'tasks', versions, task, null)
         return handleCORS(NextResponse.json({ message: 'Task deleted' }))
       }
     }
@@ -350,7 +495,9 @@ async function handleRoute(request, { params }) {
       if (!task_ids || !updates) return handleCORS(NextResponse.json({ error: 'task_ids and updates required' }, { status: 400 }))
       const { _id, id, ...updateData } = updates
       updateData.updated_at = new Date()
+      const affected = await database.collection('tasks').distinct('client_id', { id: { $in: task_ids } })
       await database.collection('tasks').updateMany({ id: { $in: task_ids } }, { $set: updateData })
+      await rebuildPortalSnapshots(database, updateData.client_id ? [...affected, updateData.client_id] : affected)
       return handleCORS(NextResponse.json({ message: `Updated ${task_ids.length} tasks` }))
     }
 
@@ -433,7 +580,9 @@ async function handleRoute(request, { params }) {
         notes: body.notes || null,
         created_at: new Date()
       }
+      const versions = await portalSnapshotVersions(database, [client_id])
       await database.collection('reports').insertOne(report)
+      await syncSnapshotItem(database, 'reports', versions, null, report)
       return handleCORS(NextResponse.json(report))
     }
 
@@ -445,15 +594,22 @@ async function handleRoute(request, { params }) {
         if (!user) return handleCORS(NextResponse.json({ error: 'Unauthorized' }, { status: 401 }))
         const body = await request.json()
         const { _id, id, ...updateData } = body
+        updateData.updated_at = new Date()
+        const before = await database.collection('reports').findOne({ id: reportId })
+        const versions = await portalSnapshotVersions(database, [before?.client_id, updateData.client_id])
         await database.collection('reports').updateOne({ id: reportId }, { $set: updateData })
         const updated = await database.collection('reports').findOne({ id: reportId })
+        await syncSnapshotItem(database, 'reports', versions, before, updated)
         const { _id: _, ...result } = updated
         return handleCORS(NextResponse.json(result))
       }
       if (method === 'DELETE') {
         const user = verifyToken(request)
         if (!user) return handleCORS(NextResponse.json({ error: 'Unauthorized' }, { status: 401 }))
+        const report = await database.collection('reports').findOne({ id: reportId })
+        const versions = await portalSnapshotVersions(database, [report?.client_id])
         await database.collection('reports').deleteOne({ id: reportId })
+        if (report) await syncSnapshotItem(database, 'reports', versions, report, null)
         return handleCORS(NextResponse.json({ message: 'Report deleted' }))
       }
     }
@@ -462,9 +618,21 @@ async function handleRoute(request, { params }) {
     const portalMatch = route.match(/^\/portal\/([^/]+)$/)
     if (portalMatch && method === 'GET') {
       const slug = portalMatch[1]
-      const client = await database.collection('clients').findOne({ slug, is_active: true })
-      if (!client) return handleCORS(NextResponse.json({ error: 'Client not found' }, { status: 404 }))
-      const { _id, portal_password: pp, ...clientData } = client
+      let snapshot = await database.collection('portal_snapshots').findOne({ slug, is_active: true }, { projection: PORTAL_SNAPSHOT_PROJECTION })
+      if (!snapshot) {
+        // Clients created before snapshots existed (or whose snapshot was dropped) get one built on view
+        const client = await database.collection('clients').findOne({ slug, is_active: true })
+        const built = client ? await rebuildPortalSnapshot(database, client.id) : null
+        if (built) {
+          snapshot = {
+            ...built,
+            tasks: built.tasks.map(({ _id, ...t }) => t),
+            reports: built.reports.map(({ _id, ...r }) => r)
+          }
+        }
+      }
+      if (!snapshot) return handleCORS(NextResponse.json({ error: 'Client not found' }, { status: 404 }))
+      const { client: clientData, portal_password: pp } = snapshot
       const hasPassword = !!pp
 
       // Check auth for password-protected portals
@@ -475,15 +643,10 @@ async function handleRoute(request, { params }) {
         }
       }
 
-      const tasks = await database.collection('tasks').find({ client_id: clientData.id }).sort({ category: 1, created_at: 1 }).toArray()
-      const reports = await database.collection('reports').find({ client_id: clientData.id }).sort({ report_date: -1 }).toArray()
-      const cleanTasks = tasks.map(({ _id, ...t }) => t)
-      const cleanReports = reports.map(({ _id, ...r }) => r)
-
       return handleCORS(NextResponse.json({
         client: clientData,
-        tasks: cleanTasks,
-        reports: cleanReports
+        tasks: snapshot.tasks,
+        reports: snapshot.reports
       }))
     }
 
@@ -514,10 +677,13 @@ async function handleRoute(request, { params }) {
       if (!clientDoc) return handleCORS(NextResponse.json({ error: 'Client not found' }, { status: 404 }))
       const task = await database.collection('tasks').findOne({ id: taskId, client_id: clientDoc.id })
       if (!task) return handleCORS(NextResponse.json({ error: 'Task not found' }, { status: 404 }))
+      const versions = await portalSnapshotVersions(database, [clientDoc.id])
       await database.collection('tasks').updateOne(
         { id: taskId },
         { $set: { client_approval, updated_at: new Date() } }
       )
+      const updatedTask = await database.collection('tasks').findOne({ id: taskId })
+      await syncSnapshotItem(database, 'tasks', versions, task, updatedTask)
       return handleCORS(NextResponse.json({ success: true, client_approval }))
     }
 
@@ -676,6 +842,7 @@ async function handleRoute(request, { params }) {
         }
       }
 
+      if (imported > 0) await rebuildPortalSnapshots(database, [client_id])
       return handleCORS(NextResponse.json({ imported, skipped, errors: errors.slice(0, 10) }))
     }
 
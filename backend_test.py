@@ -6,7 +6,10 @@ Tests all backend endpoints with comprehensive scenarios.
 
 import requests
 import json
+import random
+import statistics
 import sys
+import time
 from datetime import datetime
 
 # Base URL from environment
@@ -607,6 +610,194 @@ class APITester:
             self.log_test("Portal Behno Password Protection", False, error_msg="Invalid JSON response")
             return False
 
+    def _recompute_portal(self, client_id):
+        """Build the expected portal payload from the source collections"""
+        client_resp, error = self.make_request("GET", f"/clients/{client_id}", expect_status=200)
+        if error:
+            return None, error
+        tasks_resp, error = self.make_request("GET", f"/tasks?client_id={client_id}", expect_status=200)
+        if error:
+            return None, error
+        reports_resp, error = self.make_request("GET", f"/reports?client_id={client_id}", expect_status=200)
+        if error:
+            return None, error
+        client = client_resp.json()
+        tasks = [{k: v for k, v in t.items() if k not in ("client_name", "assigned_to_name")}
+                 for t in tasks_resp.json()]
+        reports = [{k: v for k, v in r.items() if k != "client_name"} for r in reports_resp.json()]
+        return {"client": client, "tasks": tasks, "reports": reports}, None
+
+    def _check_snapshot(self, client_id):
+        """Return an error message if the portal differs from a full recomputation"""
+        expected, error = self._recompute_portal(client_id)
+        if error:
+            return error
+        client = expected["client"]
+        password = client.pop("portal_password", None)
+        response, error = self.make_request("GET", f"/portal/{client['slug']}",
+                                            headers={"X-Portal-Password": password} if password else None)
+        if error:
+            return error
+        if not client.get("is_active"):
+            return None if response.status_code == 404 else f"inactive client served with {response.status_code}"
+        if response.status_code != 200:
+            return f"portal returned {response.status_code}: {response.text}"
+        actual = response.json()
+        if actual["client"] != client:
+            return f"client mismatch: portal has {actual['client']}, recomputed {client}"
+        # Ties are broken by insertion order, which the API does not expose, so check
+        # the order on the visible sort keys and the contents independently of order
+        for field in ("tasks", "reports"):
+            if sorted(actual[field], key=lambda i: i["id"]) != sorted(expected[field], key=lambda i: i["id"]):
+                return f"{field} mismatch: portal has {actual[field]}, recomputed {expected[field]}"
+        task_keys = [(t.get("category") or "", t.get("created_at") or "") for t in actual["tasks"]]
+        if task_keys != sorted(task_keys):
+            return f"tasks out of order: {task_keys}"
+        report_dates = [r.get("report_date") or "" for r in actual["reports"]]
+        if report_dates != sorted(report_dates, reverse=True):
+            return f"reports out of order: {report_dates}"
+        if password:
+            response, error = self.make_request("GET", f"/portal/{client['slug']}")
+            if error or response.status_code != 401:
+                return f"password-protected portal served without password ({error or response.status_code})"
+        return None
+
+    def _client_items(self, kind, client_id):
+        """IDs of a client's tasks or reports as the API currently reports them"""
+        response, error = self.make_request("GET", f"/{kind}?client_id={client_id}")
+        return [] if error else [item["id"] for item in response.json()]
+
+    def test_portal_snapshot_consistency(self):
+        """Test GET /api/portal/{slug} matches a full recomputation after random writes"""
+        if not self.auth_token:
+            self.log_test("Portal Snapshot Consistency", False, error_msg="No auth token available")
+            return False
+
+        seed = int(time.time())
+        rng = random.Random(seed)
+        client_ids = []
+        for name in ("A", "B"):
+            response, error = self.make_request("POST", "/clients",
+                                                {"name": f"Snapshot Test {name} {seed}", "service_type": "SEO"},
+                                                expect_status=200)
+            if error:
+                self.log_test("Portal Snapshot Consistency", False, error_msg=error)
+                return False
+            client_ids.append(response.json()["id"])
+        categories = ["SEO & Content", "Design", "Page Speed", "Reporting", "Other"]
+        statuses = ["To Be Started", "In Progress", "To Be Approved", "Completed", "Blocked"]
+        approvals = ["Pending Review", "Approved", "Required Changes"]
+
+        def report_date():
+            return f"2025-0{rng.randint(1, 9)}-{rng.randint(10, 28)}"
+
+        try:
+            for step in range(80):
+                client_id = rng.choice(client_ids)
+                other_id = client_ids[1 - client_ids.index(client_id)]
+                task_ids = self._client_items("tasks", client_id)
+                report_ids = self._client_items("reports", client_id)
+                op = rng.choice(["create_task", "bulk_create", "update_task", "move_task", "delete_task",
+                                 "approve_task", "bulk_update", "create_report", "update_report", "move_report",
+                                 "delete_report", "update_client"])
+                if op.endswith("task") and op != "create_task" and not task_ids:
+                    op = "create_task"
+                if op == "bulk_update" and not task_ids:
+                    op = "bulk_create"
+                if op.endswith("report") and op != "create_report" and not report_ids:
+                    op = "create_report"
+
+                if op == "create_task":
+                    resp, error = self.make_request("POST", "/tasks", {
+                        "title": f"snapshot task {step}", "client_id": client_id,
+                        "category": rng.choice(categories), "status": rng.choice(statuses)})
+                elif op == "bulk_create":
+                    resp, error = self.make_request("POST", "/tasks/bulk", {"tasks": [
+                        {"title": f"snapshot bulk {step}-{i}", "client_id": rng.choice(client_ids),
+                         "category": rng.choice(categories)} for i in range(rng.randint(1, 4))]})
+                elif op == "update_task":
+                    resp, error = self.make_request("PUT", f"/tasks/{rng.choice(task_ids)}", {
+                        "category": rng.choice(categories), "status": rng.choice(statuses)})
+                elif op == "move_task":
+                    resp, error = self.make_request("PUT", f"/tasks/{rng.choice(task_ids)}", {"client_id": other_id})
+                elif op == "delete_task":
+                    resp, error = self.make_request("DELETE", f"/tasks/{rng.choice(task_ids)}")
+                elif op == "approve_task":
+                    # Approvals are only accepted on active portals
+                    resp, error = self.make_request("GET", f"/clients/{client_id}", expect_status=200)
+                    if not error:
+                        client = resp.json()
+                        expected_status = 200 if client.get("is_active") else 404
+                        resp, error = self.make_request(
+                            "PUT", f"/portal/{client['slug']}/tasks/{rng.choice(task_ids)}/approval",
+                            {"client_approval": rng.choice(approvals)}, expect_status=expected_status)
+                        if not error and expected_status == 404:
+                            continue
+                elif op == "bulk_update":
+                    updates = {"priority": rng.choice(["P0", "P1", "P2"]), "category": rng.choice(categories)}
+                    if rng.random() < 0.3:
+                        updates["client_id"] = other_id
+                    resp, error = self.make_request("POST", "/tasks/bulk-update", {
+                        "task_ids": rng.sample(task_ids, min(len(task_ids), 3)), "updates": updates})
+                elif op == "create_report":
+                    resp, error = self.make_request("POST", "/reports", {
+                        "title": f"Snapshot report {step}", "client_id": client_id,
+                        "report_url": "https://docs.google.com", "report_date": report_date()})
+                elif op == "update_report":
+                    resp, error = self.make_request("PUT", f"/reports/{rng.choice(report_ids)}",
+                                                    {"report_date": report_date()})
+                elif op == "move_report":
+                    resp, error = self.make_request("PUT", f"/reports/{rng.choice(report_ids)}", {"client_id": other_id})
+                elif op == "delete_report":
+                    resp, error = self.make_request("DELETE", f"/reports/{rng.choice(report_ids)}")
+                else:
+                    change = rng.choice([
+                        {"slug": f"snapshot-test-{seed}-{step}"},
+                        {"is_active": rng.random() < 0.7},
+                        {"portal_password": rng.choice([None, f"pw{step}"])},
+                    ])
+                    resp, error = self.make_request("PUT", f"/clients/{client_id}", change)
+                if error or resp.status_code != 200:
+                    self.log_test("Portal Snapshot Consistency", False,
+                                  error_msg=f"Step {step} ({op}, seed {seed}): {error or resp.text}")
+                    return False
+                if step % 10 == 9:
+                    for cid in client_ids:
+                        mismatch = self._check_snapshot(cid)
+                        if mismatch:
+                            self.log_test("Portal Snapshot Consistency", False,
+                                          error_msg=f"After step {step} (seed {seed}): {mismatch}")
+                            return False
+
+            # Time the snapshot read against recomputing the same payload through the
+            # /clients, /tasks and /reports endpoints (three round trips, so an upper bound)
+            slug = f"snapshot-test-{seed}-final"
+            self.make_request("PUT", f"/clients/{client_ids[0]}",
+                              {"slug": slug, "is_active": True, "portal_password": None})
+            snapshot_times, recompute_times = [], []
+            for _ in range(20):
+                start = time.perf_counter()
+                self.make_request("GET", f"/portal/{slug}", expect_status=200)
+                snapshot_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                self._recompute_portal(client_ids[0])
+                recompute_times.append(time.perf_counter() - start)
+        finally:
+            for cid in client_ids:
+                self.make_request("DELETE", f"/clients/{cid}")
+
+        response, error = self.make_request("GET", f"/portal/{slug}")
+        if error or response.status_code != 404:
+            self.log_test("Portal Snapshot Consistency", False,
+                          error_msg=f"Deleted client portal still served (seed {seed})")
+            return False
+
+        self.log_test("Portal Snapshot Consistency", True,
+                      f"2 clients matched after 80 random writes (seed {seed}); median portal read "
+                      f"{statistics.median(snapshot_times) * 1000:.1f}ms snapshot "
+                      f"vs {statistics.median(recompute_times) * 1000:.1f}ms recomputed via /clients, /tasks, /reports")
+        return True
+
     def run_all_tests(self):
         """Run all backend tests in sequence"""
         print("🚀 Starting Agency Dashboard Backend API Tests")
@@ -629,6 +820,7 @@ class APITester:
             self.test_get_stats,
             self.test_portal_bandolier,
             self.test_portal_behno_password_protection,
+            self.test_portal_snapshot_consistency,
         ]
         
         passed = 0